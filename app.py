@@ -11,6 +11,7 @@ import plotly.graph_objects as go
 from data_forecast import (
     TRUST_NAME,
     get_historical_pl_df,
+    get_executive_kpis,
     get_monthly_forecast_base,
     get_monthly_forecast_scenarios,
     get_monthly_cashflow_detailed,
@@ -45,17 +46,55 @@ st.markdown("""
 st.markdown(f'<p class="main-header">📊 Cashflow Forecast & Working Capital Dashboard</p>', unsafe_allow_html=True)
 st.markdown(f'<p class="sub-header">{TRUST_NAME} · FY 2025/26 forecast (Apr 25 – Mar 26) ', unsafe_allow_html=True)
 
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "Executive summary",
-    "Monthly forecast",
-    "Working capital",
-    "Scenario modelling",
-    "Assumptions & methodology",
-    "Recommendations",
-])
+
+def _whole_number_columns(cols):
+    """column_config showing cols as "%,.0f" (whole numbers, thousands separators), formatted client-side."""
+    return {col: st.column_config.NumberColumn(format="%,.0f") for col in cols}
+
+
+# Figure factories are cached as shared resources keyed on their input data; do not mutate the returned figures.
+@st.cache_resource
+def _fig_income_exp(pl_df):
+    periods_hist = pl_df["year"].tolist()
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=periods_hist, y=pl_df["patient_care_income"], name="Patient care income", marker_color="#2563eb"))
+    fig.add_trace(go.Bar(x=periods_hist, y=pl_df["other_operating_income"], name="Other income", marker_color="#60a5fa"))
+    fig.add_trace(go.Bar(x=periods_hist, y=-pl_df["operating_expenses"], name="Operating expenses", marker_color="#dc2626"))
+    fig.update_layout(barmode="group", title="Income vs expenses (£k) — 5-year view", xaxis_title="Year", yaxis_title="£000", height=380, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    return fig
+
+
+@st.cache_resource
+def _fig_surplus(pl_df):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=pl_df["year"].tolist(), y=pl_df["operating_surplus_deficit"], name="Operating surplus/(deficit)", marker_color=["#059669" if x >= 0 else "#dc2626" for x in pl_df["operating_surplus_deficit"]]))
+    fig.update_layout(title="Operating result (£k)", xaxis_title="Year", yaxis_title="£000", height=320)
+    return fig
+
+
+@st.cache_resource
+def _fig_cash():
+    cash_hist = [15930, 10646]
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=["Apr 24", "Mar 25"], y=cash_hist, mode="lines+markers", name="Group cash", line=dict(color="#059669", width=3), marker=dict(size=12)))
+    fig.update_layout(title="Cash position (£k)", xaxis_title="Period", yaxis_title="Cash £000", height=320)
+    return fig
+
+
+@st.cache_resource
+def _fig_forecast_runway(periods, runway):
+    """runway: tuple of (scenario, tuple of monthly closing cash) pairs."""
+    colors = {"Best": "#059669", "Base": "#2563eb", "Worst": "#dc2626"}
+    fig = go.Figure()
+    for scenario, monthly_cash in runway:
+        fig.add_trace(go.Scattergl(x=periods, y=monthly_cash, mode="lines+markers", name=scenario, line=dict(color=colors[scenario], width=2)))
+    fig.update_layout(title="Forecast closing cash by scenario (£k) — Apr 25 to Mar 26", xaxis_title="Period", yaxis_title="Cash £000", height=360, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    return fig
+
 
 # --- Tab 1: Executive summary (problem, solution, context) ---
-with tab1:
+@st.fragment
+def _executive_summary_tab(pl_df, scenarios_dict, k):
     st.subheader("Problem scenario")
     st.markdown("""
     **Metropolitan NHS Foundation Trust** is a typical acute and community provider facing:
@@ -83,61 +122,42 @@ with tab1:
     st.info("Data is based on a typical NHS Foundation Trust financial statements (2024/25).")
 
     # High-level KPIs
-    pl_df = get_historical_pl_df()
-    sfp = get_sfp_summary()
-    _, scenarios_dict = get_monthly_forecast_scenarios()
-
     c1, c2, c3, c4, c5 = st.columns(5)
     with c1:
-        st.metric("2024/25 Operating deficit (£k)", f"{pl_df.loc[pl_df['year']=='2024/25', 'operating_surplus_deficit'].values[0]:,.0f}", help="P&L operating result")
+        st.metric("2024/25 Operating deficit (£k)", f"{k.op_deficit:,.0f}", help="P&L operating result")
     with c2:
-        st.metric("Cash at 31 Mar 25 (£k)", f"{sfp['cash_25']:,.0f}", help="Group cash per SFP")
+        st.metric("Cash at 31 Mar 25 (£k)", f"{k.cash_25:,.0f}", help="Group cash per SFP")
     with c3:
-        st.metric("Base case cash Mar 26 (£k)", f"{scenarios_dict['Base']['cash_close_000']:,.0f}", help="Forecast closing cash, base scenario")
+        st.metric("Base case cash Mar 26 (£k)", f"{k.base_close:,.0f}", help="Forecast closing cash, base scenario")
     with c4:
-        st.metric("Worst case cash Mar 26 (£k)", f"{scenarios_dict['Worst']['cash_close_000']:,.0f}", help="Forecast closing cash, worst scenario")
+        st.metric("Worst case cash Mar 26 (£k)", f"{k.worst_close:,.0f}", help="Forecast closing cash, worst scenario")
     with c5:
-        st.metric("Best case cash Mar 26 (£k)", f"{scenarios_dict['Best']['cash_close_000']:,.0f}", help="Forecast closing cash, best scenario")
+        st.metric("Best case cash Mar 26 (£k)", f"{k.best_close:,.0f}", help="Forecast closing cash, best scenario")
 
     # Executive summary: aesthetic charts for non-technical stakeholders
     st.subheader("At a glance")
-    periods_hist = pl_df["year"].tolist()
-    fig_income_exp = go.Figure()
-    fig_income_exp.add_trace(go.Bar(x=periods_hist, y=pl_df["patient_care_income"], name="Patient care income", marker_color="#2563eb"))
-    fig_income_exp.add_trace(go.Bar(x=periods_hist, y=pl_df["other_operating_income"], name="Other income", marker_color="#60a5fa"))
-    fig_income_exp.add_trace(go.Bar(x=periods_hist, y=-pl_df["operating_expenses"], name="Operating expenses", marker_color="#dc2626"))
-    fig_income_exp.update_layout(barmode="group", title="Income vs expenses (£k) — 5-year view", xaxis_title="Year", yaxis_title="£000", height=380, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-    st.plotly_chart(fig_income_exp, use_container_width=True)
+    st.plotly_chart(_fig_income_exp(pl_df), use_container_width=True)
 
     col_a, col_b = st.columns(2)
     with col_a:
-        fig_surplus = go.Figure()
-        fig_surplus.add_trace(go.Bar(x=periods_hist, y=pl_df["operating_surplus_deficit"], name="Operating surplus/(deficit)", marker_color=["#059669" if x >= 0 else "#dc2626" for x in pl_df["operating_surplus_deficit"]]))
-        fig_surplus.update_layout(title="Operating result (£k)", xaxis_title="Year", yaxis_title="£000", height=320)
-        st.plotly_chart(fig_surplus, use_container_width=True)
+        st.plotly_chart(_fig_surplus(pl_df), use_container_width=True)
     with col_b:
-        cash_hist = [15930, 10646]
-        fig_cash = go.Figure()
-        fig_cash.add_trace(go.Scatter(x=["Apr 24", "Mar 25"], y=cash_hist, mode="lines+markers", name="Group cash", line=dict(color="#059669", width=3), marker=dict(size=12)))
-        fig_cash.update_layout(title="Cash position (£k)", xaxis_title="Period", yaxis_title="Cash £000", height=320)
-        st.plotly_chart(fig_cash, use_container_width=True)
-
-    fig_forecast_runway = go.Figure()
-    periods_f = _periods_list()
-    for scenario, color in [("Best", "#059669"), ("Base", "#2563eb"), ("Worst", "#dc2626")]:
-        fig_forecast_runway.add_trace(go.Scatter(x=periods_f, y=scenarios_dict[scenario]["monthly_cash_000"], mode="lines+markers", name=scenario, line=dict(color=color, width=2)))
-    fig_forecast_runway.update_layout(title="Forecast closing cash by scenario (£k) — Apr 25 to Mar 26", xaxis_title="Period", yaxis_title="Cash £000", height=360, legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-    st.plotly_chart(fig_forecast_runway, use_container_width=True)
+        st.plotly_chart(_fig_cash(), use_container_width=True)
+
+    runway = tuple((scenario, tuple(scenarios_dict[scenario]["monthly_cash_000"])) for scenario in ("Best", "Base", "Worst"))
+    st.plotly_chart(_fig_forecast_runway(_periods_list(), runway), use_container_width=True)
+
 
 # --- Tab 2: Monthly forecast ---
-with tab2:
+@st.fragment
+def _monthly_forecast_tab():
     st.subheader("12-month cashflow forecast (Apr 25 – Mar 26)")
     scenario_forecast = st.radio("Scenario", ["Base", "Best"], horizontal=True, help="Best case includes £8m receivables over 12 months (£8m/12 per month).")
     cf_detailed = get_monthly_cashflow_detailed(scenario_forecast.lower())
     # cf_detailed: index = line items, columns = periods (already transposed)
     cf_display = cf_detailed.copy()
     cf_display.index.name = "Line item"
-    st.dataframe(cf_display.style.format("{:,.0f}", subset=cf_display.columns.tolist()), use_container_width=True)
+    st.dataframe(cf_display, use_container_width=True, column_config=_whole_number_columns(cf_display.columns))
 
     st.subheader("What makes up income and expenses — assumptions")
     assumptions = get_income_expense_assumptions()
@@ -157,39 +177,41 @@ with tab2:
     st.plotly_chart(fig_income, use_container_width=True)
 
     fig_runway = go.Figure()
-    fig_runway.add_trace(go.Scatter(x=periods_plot, y=cf_display.loc["Closing Cash"], mode="lines+markers", name="Closing cash", line=dict(color="#059669", width=3)))
+    fig_runway.add_trace(go.Scattergl(x=periods_plot, y=cf_display.loc["Closing Cash"], mode="lines+markers", name="Closing cash", line=dict(color="#059669", width=3)))
     fig_runway.update_layout(title="Closing cash position by period (£k)", xaxis_title="Period", yaxis_title="Cash £000", height=340)
     st.plotly_chart(fig_runway, use_container_width=True)
 
+
 # --- Tab 3: Working capital ---
-with tab3:
+@st.fragment
+def _working_capital_tab(sfp):
     st.subheader("Working capital and balance sheet")
     wc = get_working_capital_metrics()
     wc_display = wc.copy()
     wc_display.columns = ["Metric", "31 Mar 24 (£k)", "31 Mar 25 (£k)"]
-    st.dataframe(wc_display.style.format("{:,.0f}", subset=["31 Mar 24 (£k)", "31 Mar 25 (£k)"]), use_container_width=True)
+    st.dataframe(wc_display, use_container_width=True, column_config=_whole_number_columns(["31 Mar 24 (£k)", "31 Mar 25 (£k)"]))
     st.caption("Receivables and payables have both increased; cash has fallen. Net working capital position has tightened.")
-    sfp = get_sfp_summary()
     col1, col2 = st.columns(2)
     with col1:
         st.metric("Current ratio (31 Mar 25)", f"{(sfp['current_assets_25'] / sfp['current_liabilities_25']):.2f}", help="Current assets / current liabilities")
     with col2:
         st.metric("Cash as % of current assets", f"{(sfp['cash_25'] / sfp['current_assets_25'] * 100):.1f}%", help="Liquidity")
 
+
 # --- Tab 4: Scenario modelling ---
-with tab4:
+@st.fragment
+def _scenario_modelling_tab(scenarios_dict):
     st.subheader("Scenario modelling: Best / Base / Worst / Do nothing")
-    _, scenarios_dict = get_monthly_forecast_scenarios()
     scenario_df = pd.DataFrame([
         {"Scenario": k, "Operating CF (£k)": v["operating_cf_000"], "Closing cash (£k)": v["cash_close_000"]}
         for k, v in scenarios_dict.items()
     ])
-    st.dataframe(scenario_df.style.format("{:,.0f}", subset=["Operating CF (£k)", "Closing cash (£k)"]), use_container_width=True)
+    st.dataframe(scenario_df, use_container_width=True, column_config=_whole_number_columns(["Operating CF (£k)", "Closing cash (£k)"]))
 
     fig_sc = go.Figure()
     months = _periods_list()
     for scenario, color in [("Best", "#059669"), ("Base", "#2563eb"), ("Worst", "#dc2626"), ("Do nothing", "#6b7280")]:
-        fig_sc.add_trace(go.Scatter(x=months, y=scenarios_dict[scenario]["monthly_cash_000"], mode="lines+markers", name=scenario, line=dict(color=color, width=2)))
+        fig_sc.add_trace(go.Scattergl(x=months, y=scenarios_dict[scenario]["monthly_cash_000"], mode="lines+markers", name=scenario, line=dict(color=color, width=2)))
     fig_sc.update_layout(title="Closing cash by scenario (£k)", xaxis_title="Period", yaxis_title="Cash £000", height=450)
     st.plotly_chart(fig_sc, use_container_width=True)
 
@@ -202,8 +224,10 @@ with tab4:
     | **Do nothing** | Flat | +5% | Flat | None | None | No mitigation; costs drift, income flat |
     """)
 
+
 # --- Tab 5: Assumptions ---
-with tab5:
+@st.fragment
+def _assumptions_tab():
     st.subheader("Assumptions and methodology")
     st.markdown("""
     **Revenue inflow**
@@ -227,8 +251,10 @@ with tab5:
     sea_df = pd.DataFrame(list(MONTHLY_SEASONALITY.items()), columns=["Month", "Index (1.0 = avg)"])
     st.dataframe(sea_df, use_container_width=True)
 
+
 # --- Tab 6: Recommendations ---
-with tab6:
+@st.fragment
+def _recommendations_tab():
     st.subheader("Recommendations")
     st.markdown("""
     1. **Liquidity**: Monitor monthly cash against base and worst-case scenarios; agree a minimum cash floor and escalation with treasury/board.
@@ -239,6 +265,38 @@ with tab6:
     6. **Do-nothing risk**: If no action is taken, the do-nothing scenario shows materially lower closing cash; recommend at least base-case mitigations.
     """)
 
+
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+    "Executive summary",
+    "Monthly forecast",
+    "Working capital",
+    "Scenario modelling",
+    "Assumptions & methodology",
+    "Recommendations",
+])
+
+# Shared inputs, fetched once per rerun and passed to the tabs that use them.
+# Scenario forecast is static per session: compute once and keep in session state.
+if "scenarios" not in st.session_state:
+    _, st.session_state["scenarios"] = get_monthly_forecast_scenarios()
+pl_df = get_historical_pl_df()
+sfp = get_sfp_summary()
+scenarios_dict = st.session_state["scenarios"]
+kpis = get_executive_kpis(sfp, scenarios_dict)
+
+with tab1:
+    _executive_summary_tab(pl_df, scenarios_dict, kpis)
+with tab2:
+    _monthly_forecast_tab()
+with tab3:
+    _working_capital_tab(sfp)
+with tab4:
+    _scenario_modelling_tab(scenarios_dict)
+with tab5:
+    _assumptions_tab()
+with tab6:
+    _recommendations_tab()
+
 st.sidebar.markdown("### About")
 st.sidebar.markdown("Dashboard built from **actual NHS Foundation Trust** 2024/25 financial statements. Forecast period: Apr 25 – Mar 26.")
 st.sidebar.markdown("Suitable for **cashflow modelling, scenario analysis and dashboard delivery.**")
@@ -6,7 +6,10 @@ Trust name masked; figures derived from published accounts.
 
 import pandas as pd
 import numpy as np
+import streamlit as st
+from collections import namedtuple
 from datetime import datetime
+from functools import lru_cache
 
 # Generic trust name for portfolio / CV
 TRUST_NAME = "Metropolitan NHS Foundation Trust"
@@ -22,6 +25,8 @@ HISTORICAL_PL = {
     "net_finance_costs": [-2359, -2701, -3550, -2825, -3656],
     "surplus_deficit_year": [-9913, -1071, 2834, -24833, -8947],
 }
+# Column arrays (one np.ndarray per P&L line) for direct index access; last element is 2024/25
+HISTORICAL_PL_ARRAYS = {col: np.array(values) for col, values in HISTORICAL_PL.items()}
 
 # --- 2024/25 Cash Flow Statement (£000) ---
 CASHFLOW_2024_25 = {
@@ -51,7 +56,7 @@ EXPENSE_BREAKDOWN_2024_25 = {
     "clinical_supplies": 33177,
     "other_operating": 535966 - 386011 - 26669 - 33177 - 172,  # NED 172
 }
-OPERATING_DEFICIT_2024_25 = -5261
+OPERATING_DEFICIT_2024_25 = int(HISTORICAL_PL_ARRAYS["operating_surplus_deficit"][-1])  # -5,261
 
 # Receivables: assume £8m of 2024/25 outstanding collected in Best case over 12 months (straight line)
 RECEIVABLES_COLLECTION_BEST_CASE_000 = 8000
@@ -67,164 +72,162 @@ MONTHLY_SEASONALITY = {
 }
 
 MONTHS_ORDER = ["Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec", "Jan", "Feb", "Mar"]
+# Seasonality by month index (0 = Apr) for array maths
+MONTHLY_SEASONALITY_ARR = np.array([MONTHLY_SEASONALITY[m] for m in MONTHS_ORDER], dtype=np.float64)
 
+# Capex: 2024/25 investing (£7,595k net out) maintained, phased by month index (0 = Apr) with Q4 bias
+ANNUAL_CAPEX_000 = 7595
+CAPEX_PATTERN_ARR = np.array([0.06, 0.06, 0.08, 0.08, 0.08, 0.08, 0.09, 0.09, 0.10, 0.10, 0.09, 0.09], dtype=np.float64)
 
+# Monthly finance flows (£000) from 2024/25: principal on loans + leases, PDC dividend paid, interest received
+PRINCIPAL_MONTHLY = (4147 + 5289) / 12
+PDC_DIV_MONTHLY = 3954 / 12
+INTEREST_IN_MONTHLY = 1567 / 12
+
+# FY 2025/26 period labels in MONTHS_ORDER: Apr–Dec 25, Jan–Mar 26
+_PERIODS = (
+    "Apr 25", "May 25", "Jun 25", "Jul 25", "Aug 25", "Sep 25",
+    "Oct 25", "Nov 25", "Dec 25", "Jan 26", "Feb 26", "Mar 26",
+)
+
+
+@st.cache_data(ttl=None, max_entries=8)
 def get_historical_pl_df():
-    return pd.DataFrame(HISTORICAL_PL)
+    return pd.DataFrame(HISTORICAL_PL_ARRAYS)
 
 
+@st.cache_data(ttl=None, max_entries=8)
 def get_monthly_forecast_base(fy_label="2025/26"):
     """Base case: monthly forecast Apr 25 - Mar 26 using 2024/25 run-rate + 2% income growth, 3% cost growth (cost pressure)."""
     monthly_income = (INCOME_2024_25["total_operating_income"] / 12) * 1.02
     monthly_expenses = (EXPENSES_2024_25 / 12) * 1.03
     # Apply seasonality
-    income_by_month = [
-        monthly_income * MONTHLY_SEASONALITY[m] for m in MONTHS_ORDER
-    ]
-    expenses_by_month = [
-        monthly_expenses * MONTHLY_SEASONALITY[m] for m in MONTHS_ORDER
-    ]
-    operating_cf = [i - e for i, e in zip(income_by_month, expenses_by_month)]
+    income_by_month = monthly_income * MONTHLY_SEASONALITY_ARR
+    expenses_by_month = monthly_expenses * MONTHLY_SEASONALITY_ARR
+    operating_cf = income_by_month - expenses_by_month
     # Finance: interest and PDC dividend spread evenly (from 2024/25: net finance ~£3,656k, PDC div £3,488k)
     monthly_finance_out = (3656 + 3488) / 12
     # Capex: from 2024/25 investing (£7,595k net out), spread with Q4 bias
-    capex_pattern = [0.06, 0.06, 0.08, 0.08, 0.08, 0.08, 0.09, 0.09, 0.10, 0.10, 0.09, 0.09]
-    annual_capex = 7595  # maintain similar level
-    capex_by_month = [annual_capex * p for p in capex_pattern]
-    # Financing inflow: assume no new PDC in base; principal repayments as per 2024/25
-    principal_repay = (4147 + 5289) / 12  # loans + leases
-    pdc_dividend_monthly = 3954 / 12  # PDC dividend paid
-    financing_flow = [-principal_repay - pdc_dividend_monthly] * 12
+    capex_by_month = ANNUAL_CAPEX_000 * CAPEX_PATTERN_ARR
+    # Financing inflow: assume no new PDC in base; principal repayments and PDC dividend as per 2024/25
+    financing_flow = [-PRINCIPAL_MONTHLY - PDC_DIV_MONTHLY] * 12
     financing_flow[0] += 0   # no new PDC in base
-    # Interest received ~£1,567/12 per month
-    interest_in = 1567 / 12
     cash_start = CASH_GROUP_OPEN_31MAR25
     cash = [cash_start]
     for i in range(12):
         cf_oper = operating_cf[i]
-        cf_inv = -capex_by_month[i] + interest_in
+        cf_inv = -capex_by_month[i] + INTEREST_IN_MONTHLY
         cf_fin = financing_flow[i]
         cash.append(cash[-1] + cf_oper + cf_inv + cf_fin)
-    periods = _periods_list()
     return pd.DataFrame({
-        "period": periods,
-        "income_000": np.round(income_by_month, 0),
-        "expenses_000": np.round(expenses_by_month, 0),
-        "operating_cf_000": np.round(operating_cf, 0),
-        "capex_000": np.round(capex_by_month, 0),
-        "financing_000": np.round(financing_flow, 0),
-        "cash_close_000": np.round(cash[1:], 0),
-    })
+        "period": list(_PERIODS),
+        "income_000": income_by_month,
+        "expenses_000": expenses_by_month,
+        "operating_cf_000": operating_cf,
+        "capex_000": capex_by_month,
+        "financing_000": financing_flow,
+        "cash_close_000": cash[1:],
+    }).round(0)
 
 
 def _periods_list():
-    # FY 2025/26: Apr–Dec 25, Jan–Mar 26
-    return [f"{m} 25" if m in ["Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"] else f"{m} 26" for m in MONTHS_ORDER]
+    return _PERIODS
+
+
+# Scenario levers: income mult, cost mult, capex mult, PDC injection (£000), £8m receivables collected
+_SCENARIO_LEVERS = {
+    "Best": (1.04, 1.01, 0.90, 5000, True),
+    "Base": (1.02, 1.03, 1.00, 0, False),
+    "Worst": (0.99, 1.05, 1.00, 0, False),
+    "Do nothing": (1.00, 1.05, 1.00, 0, False),
+}
+
+_MonthlyCashflow = namedtuple(
+    "_MonthlyCashflow",
+    ["income_lines", "expense_lines", "inc", "exp", "op_cf", "capex", "fin", "rec", "net", "cash"],
+)
 
 
+@lru_cache(maxsize=16)
+def _kernel(income_lines, expense_lines, inc_mult, exp_mult, capex_mult, pdc_extra, use_rec):
+    """
+    Monthly cash roll-forward shared by the scenario and detailed forecasts.
+    income_lines / expense_lines: 2024/25 annual bases (£000), spread over the year by seasonality.
+    Lever arguments are tuples with one entry per scenario, so each array is (n_scenarios, 12);
+    income_lines / expense_lines arrays are (n_scenarios, n_lines, 12). Arrays are read-only as they are cached.
+    """
+    inc_mult = np.array(inc_mult)[:, None, None]
+    exp_mult = np.array(exp_mult)[:, None, None]
+    income = (np.array(income_lines)[None, :, None] * inc_mult / 12) * MONTHLY_SEASONALITY_ARR
+    expenses = (np.array(expense_lines)[None, :, None] * exp_mult / 12) * MONTHLY_SEASONALITY_ARR
+    inc = income.sum(axis=1)
+    exp = expenses.sum(axis=1)
+    op_cf = inc - exp
+
+    capex = ANNUAL_CAPEX_000 * np.array(capex_mult)[:, None] * CAPEX_PATTERN_ARR
+    # Principal (loans + leases) and PDC dividend out, interest received in; PDC injection lands in April
+    fin = np.full(op_cf.shape, -(PRINCIPAL_MONTHLY + PDC_DIV_MONTHLY) + INTEREST_IN_MONTHLY)
+    fin[:, 0] += np.array(pdc_extra) / 12
+    rec = np.where(np.array(use_rec)[:, None], RECEIVABLES_MONTHLY_000, 0.0) * np.ones(12)
+
+    # Net Cash Flow = Net Operating + Financing - Capex + Receivables Impact
+    net = op_cf + fin - capex + rec
+    cash = CASH_GROUP_OPEN_31MAR25 + np.cumsum(net, axis=1)
+
+    result = _MonthlyCashflow(income, expenses, inc, exp, op_cf, capex, fin, rec, net, cash)
+    for arr in result:
+        arr.setflags(write=False)
+    return result
+
+
+@st.cache_data(ttl=None, max_entries=8)
 def get_monthly_cashflow_detailed(scenario="base"):
     """
     Returns cashflow forecast in requested format, transposed: rows = line items, columns = periods.
     scenario: 'base' or 'best'. Best case includes £8m receivables collection over 12 months (£8m/12 per month).
     """
-    periods = _periods_list()
-    # Base growth: income +2%, costs +3%
-    inc_mult = 1.02 if scenario == "base" else 1.04
-    exp_mult = 1.03 if scenario == "base" else 1.01
-    # Monthly run-rates with seasonality
-    pc_annual = INCOME_2024_25["patient_care"] * inc_mult
-    other_annual = INCOME_2024_25["other_operating"] * (1.02 if scenario == "base" else 1.04)
-    staff_annual = EXPENSE_BREAKDOWN_2024_25["staff_costs"] * exp_mult
-    drugs_annual = EXPENSE_BREAKDOWN_2024_25["drugs"] * exp_mult
-    clinical_annual = EXPENSE_BREAKDOWN_2024_25["clinical_supplies"] * exp_mult
-    other_exp_annual = EXPENSE_BREAKDOWN_2024_25["other_operating"] * exp_mult
-
-    opening = []
-    patient_care = []
-    other_income = []
-    total_income = []
-    staff = []
-    drugs = []
-    clinical_supplies = []
-    other_operating = []
-    total_outflow = []
-    net_operating = []
-    financing = []
-    capex = []
-    receivables_impact = []
-    net_cash_flow = []
-    closing = []
-
-    cash = float(CASH_GROUP_OPEN_31MAR25)
-    principal_repay = (4147 + 5289) / 12
-    pdc_div = 3954 / 12
-    interest_in = 1567 / 12
-    capex_pattern = [0.06, 0.06, 0.08, 0.08, 0.08, 0.08, 0.09, 0.09, 0.10, 0.10, 0.09, 0.09]
-    annual_capex = 7595 * (0.90 if scenario == "best" else 1.0)
-    pdc_extra = 5000 if scenario == "best" else 0
-
-    for i in range(12):
-        m = MONTHS_ORDER[i]
-        s = MONTHLY_SEASONALITY[m]
-        opening.append(round(cash, 0))
-
-        pc_m = (pc_annual / 12) * s
-        oi_m = (other_annual / 12) * s
-        patient_care.append(round(pc_m, 0))
-        other_income.append(round(oi_m, 0))
-        tot_in = pc_m + oi_m
-        total_income.append(round(tot_in, 0))
-
-        staff_m = (staff_annual / 12) * s
-        drugs_m = (drugs_annual / 12) * s
-        clinical_m = (clinical_annual / 12) * s
-        other_exp_m = (other_exp_annual / 12) * s
-        staff.append(round(staff_m, 0))
-        drugs.append(round(drugs_m, 0))
-        clinical_supplies.append(round(clinical_m, 0))
-        other_operating.append(round(other_exp_m, 0))
-        tot_out = staff_m + drugs_m + clinical_m + other_exp_m
-        total_outflow.append(round(tot_out, 0))
-
-        net_op = tot_in - tot_out
-        net_operating.append(round(net_op, 0))
-
-        fin = -(principal_repay + pdc_div) + interest_in + (pdc_extra / 12 if i == 0 and scenario == "best" else 0)
-        financing.append(round(fin, 0))
-
-        cap = (annual_capex * capex_pattern[i])
-        capex.append(round(cap, 0))
-
-        rec_impact = RECEIVABLES_MONTHLY_000 if scenario == "best" else 0
-        receivables_impact.append(round(rec_impact, 0))
-
-        net_cf = net_op + fin - cap + rec_impact
-        net_cash_flow.append(round(net_cf, 0))
-        cash = cash + net_cf
-        closing.append(round(cash, 0))
-
-    # Build transposed: rows = line items, columns = periods
-    data = {
+    periods = list(_PERIODS)
+    # Base growth: income +2%, costs +3%; best: income +4%, costs +1%, capex -10%, PDC and receivables inflows
+    levers = _SCENARIO_LEVERS["Base" if scenario == "base" else "Best"]
+    cf = _kernel(
+        (INCOME_2024_25["patient_care"], INCOME_2024_25["other_operating"]),
+        (
+            EXPENSE_BREAKDOWN_2024_25["staff_costs"],
+            EXPENSE_BREAKDOWN_2024_25["drugs"],
+            EXPENSE_BREAKDOWN_2024_25["clinical_supplies"],
+            EXPENSE_BREAKDOWN_2024_25["other_operating"],
+        ),
+        *((lever,) for lever in levers),
+    )
+    patient_care, other_income = cf.income_lines[0]
+    staff, drugs, clinical_supplies, other_operating = cf.expense_lines[0]
+    closing = cf.cash[0]
+    opening = np.concatenate(([CASH_GROUP_OPEN_31MAR25], closing[:-1]))
+
+    # Build transposed: rows = line items, columns = periods (built directly, no .T copy)
+    line_items = {
         "Opening Cash Balance": opening,
         "Operating Inflow - patient care": patient_care,
         "Other Income": other_income,
-        "Total Operating Income": total_income,
-        "Operating Outflow": total_outflow,
+        "Total Operating Income": cf.inc[0],
+        "Operating Outflow": cf.exp[0],
         "  Staff costs": staff,
         "  Drugs": drugs,
         "  Clinical Supplies": clinical_supplies,
         "  Other operating": other_operating,
-        "Net Operating": net_operating,
-        "Financing": financing,
-        "Capex expense": capex,
-        "Receivables Impact": receivables_impact,
-        "Net Cash Flow": net_cash_flow,
+        "Net Operating": cf.op_cf[0],
+        "Financing": cf.fin[0],
+        "Capex expense": cf.capex[0],
+        "Receivables Impact": cf.rec[0],
+        "Net Cash Flow": cf.net[0],
         "Closing Cash": closing,
     }
-    df = pd.DataFrame(data, index=periods)
-    return df.T  # rows = line items, columns = periods
+    data = np.round(np.stack(list(line_items.values())), 0)
+    # Arrow-backed columns hand straight to st.dataframe's Arrow transport without a NumPy conversion
+    return pd.DataFrame(data, index=list(line_items), columns=periods, dtype="float64[pyarrow]")
 
 
+@st.cache_data(ttl=None, max_entries=8)
 def get_income_expense_assumptions():
     """Short text for dashboard: what makes up income and expenses and assumptions."""
     return {
@@ -242,46 +245,24 @@ def get_income_expense_assumptions():
     }
 
 
+@st.cache_data(ttl=None, max_entries=8)
 def get_monthly_forecast_scenarios():
     """Best / Base / Worst / Do Nothing scenarios for 2025/26. Returns base df and scenario summaries + monthly cash for charts."""
     base = get_monthly_forecast_base()
-    monthly_income_avg = INCOME_2024_25["total_operating_income"] / 12
-    monthly_exp_avg = EXPENSES_2024_25 / 12
-    annual_capex = 7595
-    pdc_dividend_annual = 3954
-    principal_annual = 4147 + 5289
-    capex_pattern = [0.06, 0.06, 0.08, 0.08, 0.08, 0.08, 0.09, 0.09, 0.10, 0.10, 0.09, 0.09]
+    # Transpose levers into one tuple per argument, each with an entry per scenario
+    cf = _kernel((INCOME_2024_25["total_operating_income"],), (EXPENSES_2024_25,), *zip(*_SCENARIO_LEVERS.values()))
 
     scenarios = {}
-    for scenario, inc_mult, exp_mult, capex_mult, pdc_extra, receivables in [
-        ("Best", 1.04, 1.01, 0.90, 5000, True),
-        ("Base", 1.02, 1.03, 1.00, 0, False),
-        ("Worst", 0.99, 1.05, 1.00, 0, False),
-        ("Do nothing", 1.00, 1.05, 1.00, 0, False),
-    ]:
-        inc = [monthly_income_avg * MONTHLY_SEASONALITY[m] * inc_mult for m in MONTHS_ORDER]
-        exp = [monthly_exp_avg * MONTHLY_SEASONALITY[m] * exp_mult for m in MONTHS_ORDER]
-        op_cf = [i - e for i, e in zip(inc, exp)]
-        capex = [annual_capex * p * capex_mult for p in capex_pattern]
-        fin_month = -(principal_annual / 12 + pdc_dividend_annual / 12) + 1567 / 12  # Include interest received
-        pdc_in_month = pdc_extra / 12 if pdc_extra else 0
-        rec_month = RECEIVABLES_MONTHLY_000 if receivables else 0
-        cash = [CASH_GROUP_OPEN_31MAR25]
-        for i in range(12):
-            cf_op = op_cf[i]  # Net Operating
-            cf_fin = fin_month + (pdc_in_month if i == 0 else 0)  # Financing (includes interest)
-            rec_impact = rec_month if receivables else 0
-            # Net Cash Flow = Net Operating + Financing - Capex + Receivables Impact
-            net_cf = cf_op + cf_fin - capex[i] + rec_impact
-            cash.append(cash[-1] + net_cf)
+    for row, scenario in enumerate(_SCENARIO_LEVERS):
         scenarios[scenario] = {
-            "operating_cf_000": sum(op_cf),
-            "cash_close_000": cash[-1],
-            "monthly_cash_000": cash[1:],
+            "operating_cf_000": float(cf.op_cf[row].sum()),
+            "cash_close_000": float(cf.cash[row, -1]),
+            "monthly_cash_000": cf.cash[row].tolist(),
         }
     return base, scenarios
 
 
+@st.cache_data(ttl=None, max_entries=8)
 def get_working_capital_metrics():
     """Working capital metrics from SFP 31 Mar 24 vs 31 Mar 25 (£000)."""
     return pd.DataFrame({
@@ -292,11 +273,12 @@ def get_working_capital_metrics():
             "Cash and equivalents",
             "Net working capital (approx)",
         ],
-        "31-Mar-24": [14652, 3483, 42184, 11921, 14652 + 3483 - 42184 + 11921],
-        "31-Mar-25": [22873, 4719, 50814, 7965, 22873 + 4719 - 50814 + 7965],
+        "31-Mar-24": pd.array([14652, 3483, 42184, 11921, 14652 + 3483 - 42184 + 11921], dtype="int64[pyarrow]"),
+        "31-Mar-25": pd.array([22873, 4719, 50814, 7965, 22873 + 4719 - 50814 + 7965], dtype="int64[pyarrow]"),
     })
 
 
+@st.cache_data(ttl=None, max_entries=8)
 def get_sfp_summary():
     """Key balance sheet items 31 Mar 24 vs 31 Mar 25 (£000)."""
     return {
@@ -315,3 +297,17 @@ def get_sfp_summary():
         "equity_24": 133561,
         "equity_25": 134140,
     }
+
+
+ExecutiveKPIs = namedtuple("ExecutiveKPIs", ["op_deficit", "cash_25", "base_close", "worst_close", "best_close"])
+
+
+def get_executive_kpis(sfp, scenarios):
+    """Headline figures for the executive summary (£000) from get_sfp_summary() and the scenario dict of get_monthly_forecast_scenarios()."""
+    return ExecutiveKPIs(
+        op_deficit=OPERATING_DEFICIT_2024_25,
+        cash_25=sfp["cash_25"],
+        base_close=scenarios["Base"]["cash_close_000"],
+        worst_close=scenarios["Worst"]["cash_close_000"],
+        best_close=scenarios["Best"]["cash_close_000"],
+    )